@@ -5,25 +5,26 @@ Main entry point for the FastAPI MCP Server.
 
 import asyncio
 import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
 
 from src.config import Config
 from src.data_loader import FastAPIDataLoader
 from src.document_fetcher import FastAPIDocumentFetcher
 from src.document_processor import FastAPIDocumentProcessor
 from src.mcp_server import FastAPIMCPServer
-from src.search_engine import ElasticsearchEngine
+from src.search_engine import ElasticsearchEngine, shutdown_all
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def initialize_server() -> FastAPIMCPServer:
+async def initialize_server(executor: Executor) -> FastAPIMCPServer:
     """Initialize the MCP server with all dependencies."""
     config = Config()
     
     # Create components following dependency injection
-    processor = FastAPIDocumentProcessor(config.FASTAPI_DOCS_URL)
+    processor = FastAPIDocumentProcessor(config.FASTAPI_DOCS_URL, executor)
     fetcher = FastAPIDocumentFetcher(
         config.FASTAPI_REPO_URL,
         config.TEMP_REPO_PATH,
@@ -42,11 +43,10 @@ async def initialize_server() -> FastAPIMCPServer:
 async def startup_initialization(mcp_server: FastAPIMCPServer):
     """Initialize the server on startup."""
     try:
-        # Check if index exists, if not, load data
+        # Check if index exists, if not, load data; reuse the server's client rather than opening another
         config = Config()
-        es = ElasticsearchEngine(config.ELASTICSEARCH_URL, config.INDEX_NAME)
         
-        if not await es.es.indices.exists(index=config.INDEX_NAME):
+        if not await mcp_server.search_engine.es.indices.exists(index=config.INDEX_NAME):
             logger.info("Index doesn't exist, loading documentation...")
             result = await mcp_server.data_loader.load_data()
             if "error" in result:
@@ -55,27 +55,29 @@ async def startup_initialization(mcp_server: FastAPIMCPServer):
                 logger.info(result["message"])
         else:
             logger.info("Index exists, server ready")
-        
-        await es.close()
     except Exception as e:
         logger.warning(f"Startup initialization failed: {e}")
 
 
-def main():
-    """Main function."""
-    async def run_server():
-        mcp_server = await initialize_server()
-        await startup_initialization(mcp_server)
-        return mcp_server
-    
-    # Initialize and run
-    mcp_server = asyncio.run(run_server())
-    
+async def serve(executor: Executor):
+    """Initialize the server and run it, all on one event loop."""
+    mcp_server = await initialize_server(executor)
     try:
-        mcp_server.run()
+        # The Elasticsearch client binds to the loop of its first request, so startup
+        # must run on the same loop as the server
+        await startup_initialization(mcp_server)
+        await mcp_server.run_async()
     finally:
-        # Cleanup
-        asyncio.run(mcp_server.close())
+        # Cleanup; engines share their clients, so those are closed once for the process
+        await mcp_server.close()
+        await shutdown_all()
+
+
+def main():
+    """Main function."""
+    # Markdown parsing is CPU-bound, so spread it across worker processes
+    with ProcessPoolExecutor() as executor:
+        asyncio.run(serve(executor))
 
 
 if __name__ == "__main__":
@@ -6,13 +6,14 @@ CLI utility for loading data into Elasticsearch.
 import asyncio
 import logging
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 from src.config import Config
 from src.data_loader import FastAPIDataLoader
 from src.document_fetcher import FastAPIDocumentFetcher
 from src.document_processor import FastAPIDocumentProcessor
-from src.search_engine import ElasticsearchEngine
+from src.search_engine import ElasticsearchEngine, shutdown_all
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,10 +22,11 @@ logger = logging.getLogger(__name__)
 async def load_data():
     """Load FastAPI documentation data."""
     config = Config()
+    executor = ProcessPoolExecutor()
     
     try:
         # Initialize components
-        processor = FastAPIDocumentProcessor(config.FASTAPI_DOCS_URL)
+        processor = FastAPIDocumentProcessor(config.FASTAPI_DOCS_URL, executor)
         fetcher = FastAPIDocumentFetcher(
             config.FASTAPI_REPO_URL,
             config.TEMP_REPO_PATH,
@@ -52,8 +54,10 @@ async def load_data():
         try:
             await fetcher.close()
             await search_engine.close()
+            await shutdown_all()
         except:
             pass
+        executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -4,32 +4,39 @@ Setup Kibana dashboard for FastAPI documentation analysis.
 Creates index patterns, visualizations, and a comprehensive dashboard.
 """
 
-import requests
+import asyncio
 import json
-import time
 from typing import Dict, Any
 
+import httpx
+
 KIBANA_URL = "http://localhost:5601"
 HEADERS = {
     "Content-Type": "application/json",
     "kbn-xsrf": "true"
 }
 
-def wait_for_kibana():
+async def wait_for_kibana(client: httpx.AsyncClient, timeout: float = 60):
     """Wait for Kibana to be ready."""
     print("Waiting for Kibana to be ready...")
-    for i in range(30):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.25
+    while True:
         try:
-            response = requests.get(f"{KIBANA_URL}/api/status")
+            # Only the status code matters, so skip downloading the status report
+            response = await client.head("/api/status", timeout=2)
             if response.status_code == 200:
                 print("✅ Kibana is ready!")
                 return True
-        except requests.exceptions.ConnectionError:
+        except httpx.TransportError:
             pass
-        time.sleep(2)
-    return False
+        if loop.time() + delay > deadline:
+            return False
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 5)
 
-def create_index_pattern():
+async def create_index_pattern(client: httpx.AsyncClient):
     """Create index pattern for fastapi_docs."""
     print("Creating index pattern...")
     
@@ -40,9 +47,8 @@ def create_index_pattern():
         }
     }
     
-    response = requests.post(
-        f"{KIBANA_URL}/api/saved_objects/index-pattern/fastapi-docs-pattern",
-        headers=HEADERS,
+    response = await client.post(
+        "/api/saved_objects/index-pattern/fastapi-docs-pattern",
         json=data
     )
     
@@ -53,13 +59,12 @@ def create_index_pattern():
         print(f"❌ Failed to create index pattern: {response.text}")
         return False
 
-def create_visualization(viz_id: str, viz_config: Dict[str, Any]):
+async def create_visualization(client: httpx.AsyncClient, viz_id: str, viz_config: Dict[str, Any]):
     """Create a visualization in Kibana."""
     print(f"Creating visualization: {viz_config['attributes']['title']}")
     
-    response = requests.post(
-        f"{KIBANA_URL}/api/saved_objects/visualization/{viz_id}",
-        headers=HEADERS,
+    response = await client.post(
+        f"/api/saved_objects/visualization/{viz_id}",
         json=viz_config
     )
     
@@ -70,7 +75,21 @@ def create_visualization(viz_id: str, viz_config: Dict[str, Any]):
         print(f"❌ Failed to create visualization: {response.text}")
         return False
 
-def create_dashboard():
+async def create_saved_search(client: httpx.AsyncClient, search_id: str, search_config: Dict[str, Any]):
+    """Create a saved search in Kibana."""
+    response = await client.post(
+        f"/api/saved_objects/search/{search_id}",
+        json=search_config
+    )
+    
+    if response.status_code in [200, 409]:
+        print("✅ Documentation table created/exists")
+        return True
+    else:
+        print(f"❌ Failed to create docs table: {response.text}")
+        return False
+
+async def create_dashboard(client: httpx.AsyncClient):
     """Create the main dashboard."""
     print("Creating FastAPI Documentation Dashboard...")
     
@@ -122,9 +141,8 @@ def create_dashboard():
         ]
     }
     
-    response = requests.post(
-        f"{KIBANA_URL}/api/saved_objects/dashboard/fastapi-docs-dashboard",
-        headers=HEADERS,
+    response = await client.post(
+        "/api/saved_objects/dashboard/fastapi-docs-dashboard",
         json=dashboard_config
     )
     
@@ -135,7 +153,7 @@ def create_dashboard():
         print(f"❌ Failed to create dashboard: {response.text}")
         return False
 
-def setup_visualizations():
+async def setup_visualizations(client: httpx.AsyncClient):
     """Setup all visualizations."""
     
     # Tags distribution pie chart
@@ -236,38 +254,31 @@ def setup_visualizations():
         ]
     }
     
-    # Create visualizations
-    create_visualization("tags-distribution", tags_viz)
-    create_visualization("sections-breakdown", sections_viz)
-    
-    # Create saved search
-    response = requests.post(
-        f"{KIBANA_URL}/api/saved_objects/search/docs-table",
-        headers=HEADERS,
-        json=docs_table
+    # Create visualizations and the saved search; they don't depend on each other
+    await asyncio.gather(
+        create_visualization(client, "tags-distribution", tags_viz),
+        create_visualization(client, "sections-breakdown", sections_viz),
+        create_saved_search(client, "docs-table", docs_table)
     )
-    
-    if response.status_code in [200, 409]:
-        print("✅ Documentation table created/exists")
-    else:
-        print(f"❌ Failed to create docs table: {response.text}")
 
-def main():
+async def main():
     """Main setup function."""
     print("🚀 Setting up Kibana dashboard for FastAPI documentation...")
     
-    if not wait_for_kibana():
-        print("❌ Kibana is not responding. Please check if it's running.")
-        return
-    
-    # Setup components
-    create_index_pattern()
-    setup_visualizations()
-    create_dashboard()
+    # One keep-alive connection pool for every Kibana call
+    async with httpx.AsyncClient(base_url=KIBANA_URL, headers=HEADERS, timeout=30.0) as client:
+        if not await wait_for_kibana(client):
+            print("❌ Kibana is not responding. Please check if it's running.")
+            return
+        
+        # Setup components; the dashboard references the visualizations, so it goes last
+        await create_index_pattern(client)
+        await setup_visualizations(client)
+        await create_dashboard(client)
     
     print("\n✅ Kibana dashboard setup complete!")
     print(f"🌐 Access your dashboard at: {KIBANA_URL}/app/dashboards#/view/fastapi-docs-dashboard")
     print(f"🔍 Explore data at: {KIBANA_URL}/app/discover#/?_g=(filters:!(),refreshInterval:(pause:!t,value:0),time:(from:now-24h,to:now))&_a=(columns:!(title,section,tags),filters:!(),index:fastapi-docs-pattern)")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -3,13 +3,22 @@ Data loader implementation following SOLID principles.
 """
 
 import logging
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 
-from .interfaces import IDataLoader, IDocumentFetcher, ISearchEngine
+from .interfaces import DocumentChunk, IDataLoader, IDocumentFetcher, ISearchEngine
 
 logger = logging.getLogger(__name__)
 
 
+async def _chain(
+    first: DocumentChunk, rest: AsyncIterator[DocumentChunk]
+) -> AsyncIterator[DocumentChunk]:
+    """Put a peeked document back in front of the rest of the stream."""
+    yield first
+    async for doc in rest:
+        yield doc
+
+
 class FastAPIDataLoader(IDataLoader):
     """Loads FastAPI documentation data into the search engine."""
     
@@ -25,22 +34,24 @@ class FastAPIDataLoader(IDataLoader):
             # Clone/update repository
             await self.fetcher.clone_or_update_repo()
             
-            # Extract documentation
-            documents = await self.fetcher.extract_documents()
+            # Extract documentation as a stream, so indexing starts with the first parsed files
+            documents = self.fetcher.iter_documents()
             
-            if not documents:
+            # Peek before touching the index; an empty repository must not replace it
+            first = await anext(documents, None)
+            if first is None:
                 return {"error": "No documents found in repository"}
             
-            # Create/recreate index
+            # Create the index, or reuse it if the mapping is unchanged
             await self.search_engine.create_index()
             
             # Index documents
-            await self.search_engine.index_documents(documents)
+            document_count = await self.search_engine.index_documents(_chain(first, documents))
             
             return {
                 "status": "success",
-                "message": f"Successfully loaded {len(documents)} documentation chunks",
-                "document_count": len(documents)
+                "message": f"Successfully loaded {document_count} documentation chunks",
+                "document_count": document_count
             }
         except Exception as e:
             logger.error(f"Data loading failed: {e}")
@@ -2,11 +2,14 @@
 Document fetcher implementation following SOLID principles.
 """
 
+import asyncio
 import logging
+import os
+from collections import deque
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, Deque, List, Optional
 
-import httpx
 from git import Repo
 
 from .interfaces import DocumentChunk, IDocumentFetcher, IDocumentProcessor
@@ -22,55 +25,109 @@ class FastAPIDocumentFetcher(IDocumentFetcher):
         repo_url: str,
         repo_path: str,
         processor: IDocumentProcessor,
-        base_docs_url: str = "https://fastapi.tiangolo.com"
+        base_docs_url: str = "https://fastapi.tiangolo.com",
+        max_concurrent_files: Optional[int] = None
     ):
         self.repo_url = repo_url
         self.repo_path = Path(repo_path)
         self.processor = processor
         self.base_docs_url = base_docs_url
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # Files in flight at once; enough to keep every parser worker fed without
+        # queueing the whole docs tree up front
+        self.max_concurrent_files = max_concurrent_files or (os.cpu_count() or 1) * 2
     
     async def clone_or_update_repo(self) -> None:
         """Clone or update the FastAPI repository."""
         try:
-            if self.repo_path.exists():
-                logger.info("Updating existing FastAPI repository...")
-                repo = Repo(self.repo_path)
-                repo.remotes.origin.pull()
-            else:
-                logger.info("Cloning FastAPI repository...")
-                self.repo_path.parent.mkdir(parents=True, exist_ok=True)
-                Repo.clone_from(self.repo_url, self.repo_path)
+            # Git operations block for the whole network transfer, so keep them off the event loop
+            await asyncio.to_thread(self._clone_or_update_repo_sync)
             logger.info("Repository updated successfully")
         except Exception as e:
             logger.error(f"Failed to clone/update repository: {e}")
             raise
     
+    def _clone_or_update_repo_sync(self) -> None:
+        """Blocking clone or update of the repository."""
+        if self.repo_path.exists():
+            logger.info("Updating existing FastAPI repository...")
+            repo = Repo(self.repo_path)
+            repo.remotes.origin.fetch(depth=1, no_tags=True)
+            repo.git.reset('--hard', 'origin/HEAD')
+        else:
+            logger.info("Cloning FastAPI repository...")
+            self.repo_path.parent.mkdir(parents=True, exist_ok=True)
+            # Only the latest English docs are indexed, so skip history and other paths
+            repo = Repo.clone_from(
+                self.repo_url,
+                self.repo_path,
+                depth=1,
+                filter='blob:none',
+                single_branch=True,
+                no_tags=True,
+                no_checkout=True
+            )
+            repo.git.sparse_checkout('init', '--cone')
+            repo.git.sparse_checkout('set', 'docs/en')
+            repo.git.checkout()
+    
     async def extract_documents(self) -> List[DocumentChunk]:
         """Extract documentation from the cloned repository."""
-        docs = []
+        return [doc async for doc in self.iter_documents()]
+    
+    async def iter_documents(self) -> AsyncIterator[DocumentChunk]:
+        """Yield documentation chunks from the cloned repository in file order."""
         docs_path = self.repo_path / "docs" / "en"
         
         if not docs_path.exists():
             logger.warning("English docs directory not found in repository")
-            return docs
+            return
         
-        # Process markdown files
-        for md_file in docs_path.rglob("*.md"):
-            try:
-                # Extract relative path for URL construction
-                rel_path = md_file.relative_to(docs_path)
-                base_url = f"{self.base_docs_url}/{rel_path.with_suffix('')}"
-                
-                content = await self.processor.process_markdown_file(str(md_file), base_url)
-                if content:
-                    docs.extend(content)
-            except Exception as e:
-                logger.error(f"Error processing {md_file}: {e}")
+        # Walking the tree is blocking disk I/O as well
+        md_files = await asyncio.to_thread(lambda: list(docs_path.rglob("*.md")))
+        
+        # Process markdown files concurrently in a sliding window; the processor decides
+        # where parsing runs. Results are yielded in file order, so chunk order and the
+        # duplicate kept are stable between loads, and a slow file holds back at most a
+        # window's worth of parsed files rather than the rest of the tree.
+        pending = iter(md_files)
+        window: Deque[asyncio.Task] = deque(
+            asyncio.create_task(self._process_file(md_file, docs_path))
+            for md_file in islice(pending, self.max_concurrent_files)
+        )
+        count = 0
+        try:
+            while window:
+                docs = await window.popleft()
+                next_file = next(pending, None)
+                if next_file is not None:
+                    window.append(asyncio.create_task(self._process_file(next_file, docs_path)))
+                for doc in docs:
+                    count += 1
+                    yield doc
+        finally:
+            # The consumer may stop early; don't leave files parsing in the background
+            for task in window:
+                task.cancel()
         
-        logger.info(f"Extracted {len(docs)} documentation chunks from repository")
-        return docs
+        logger.info(f"Extracted {count} documentation chunks from repository")
+    
+    async def _process_file(self, md_file: Path, docs_path: Path) -> List[DocumentChunk]:
+        """Process one markdown file, logging and skipping it on failure."""
+        try:
+            # Extract relative path for URL construction
+            rel_path = md_file.relative_to(docs_path).with_suffix('')
+            base_url = f"{self.base_docs_url}/{rel_path}"
+            
+            # Chunk ids come from the relative path; file names repeat across the tree
+            return await self.processor.process_markdown_file(
+                str(md_file), base_url, rel_path.as_posix()
+            ) or []
+        except Exception as e:
+            logger.error(f"Error processing {md_file}: {e}")
+            return []
     
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
+        """Clean up resources.
+        
+        Documents come from the local clone, so there is nothing to release.
+        """
@@ -2,103 +2,311 @@
 Document processing implementation following SOLID principles.
 """
 
+import asyncio
+import os
 import re
+import threading
+from concurrent.futures import Executor
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
-import aiofiles
-from bs4 import BeautifulSoup
-from markdown import markdown
+import xxhash
+from markdown_it import MarkdownIt
+from markdown_it.token import Token
 
 from .interfaces import DocumentChunk, IDocumentProcessor
 
+try:
+    import hyperscan
+except ImportError:  # Optional accelerator; extract_tags falls back to the rule table
+    hyperscan = None
+
+# Content tags as (tag, substrings, whole words, regex) rules; any hit assigns the tag.
+# Literal checks and a single word split replace a regex scan per pattern, and only
+# patterns that need more than a literal keep a compiled regex.
+_TAG_RULES = (
+    # API-related tags
+    ('api', ('@app.', 'router', 'endpoint', 'path'), (), None),
+    ('http-methods', (), ('get', 'post', 'put', 'delete', 'patch'), None),
+    ('pydantic', ('pydantic', 'basemodel'), (), None),
+    ('async', (), ('async', 'await'), None),
+    ('dependencies', ('dependency', 'depends'), (), None),
+    ('security', ('security',), ('auth',), None),
+    ('database', ('database',), ('sql',), None),
+    ('testing', (), ('test',), None),
+    ('deployment', ('deploy', 'docker'), (), None),
+    ('validation', ('validat', 'schema'), (), None),
+    ('middleware', ('middleware',), (), None),
+    ('cors', (), ('cors',), None),
+    ('websocket', ('websocket',), (), None),
+    ('background-tasks', (), (), re.compile(r'background.*task')),
+    ('file-upload', ('uploadfile',), (), re.compile(r'file.*upload')),
+)
+
+# A whole-word match (\bword\b) is exactly a \w+ run equal to the word
+_WORD_RE = re.compile(r'\w+')
+
+# Characters dropped when turning a section heading into a tag
+_SECTION_STRIP_RE = re.compile(r'[^\w\s-]')
+
+_HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_BLOCK_TAGS = frozenset({'p', 'pre', 'ul', 'ol'})
+
+# The parser keeps no per-document state, so one instance serves every thread and worker
+_MARKDOWN = MarkdownIt()
+
+
+def _compile_tag_database():
+    """Compile every tag rule into a single Hyperscan database.
+    
+    Returns the database and the tag for each pattern id, or (None, ()) when
+    hyperscan isn't installed.
+    """
+    if hyperscan is None:
+        return None, ()
+    
+    expressions = []
+    pattern_tags = []
+    for tag, substrings, whole_words, pattern in _TAG_RULES:
+        rule_expressions = [re.escape(substring).encode() for substring in substrings]
+        # Hyperscan has no Unicode \b, so spell out the word boundaries
+        rule_expressions += [
+            rb'(?:^|\W)' + re.escape(word).encode() + rb'(?:\W|$)' for word in whole_words
+        ]
+        if pattern is not None:
+            rule_expressions.append(pattern.pattern.encode())
+        expressions += rule_expressions
+        pattern_tags += [tag] * len(rule_expressions)
+    
+    # Case-insensitive Unicode matching stands in for lowercasing the content; each
+    # pattern only needs to be reported once
+    flags = (
+        hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH
+        | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+    )
+    database = hyperscan.Database()
+    database.compile(
+        expressions=expressions,
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=[flags] * len(expressions)
+    )
+    return database, tuple(pattern_tags)
+
+
+_TAG_DATABASE, _TAG_DATABASE_TAGS = _compile_tag_database()
+
+# Hyperscan scratch space can't be shared between concurrent scans, and the processor
+# may run on a thread pool
+_tag_scratch = threading.local()
+
+
+def _scan_tags(content: str) -> Set[str]:
+    """Return the content tags matched by the Hyperscan database."""
+    scratch = getattr(_tag_scratch, 'value', None)
+    if scratch is None:
+        scratch = _tag_scratch.value = hyperscan.Scratch(_TAG_DATABASE)
+    
+    tags = set()
+    
+    def on_match(pattern_id, start, end, flags, context):
+        tags.add(_TAG_DATABASE_TAGS[pattern_id])
+    
+    _TAG_DATABASE.scan(content.encode(), match_event_handler=on_match, scratch=scratch)
+    return tags
+
+
+def _inline_text(token: Token) -> str:
+    """Return the plain text of an inline token, dropping markdown markup."""
+    parts = []
+    for child in token.children or ():
+        if child.type in ('text', 'code_inline', 'image'):
+            parts.append(child.content)
+        elif child.type in ('softbreak', 'hardbreak'):
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def _iter_blocks(content: str) -> Iterator[Tuple[str, str]]:
+    """Yield (tag, text) for headings, paragraphs, code blocks and top-level lists."""
+    tokens = _MARKDOWN.parse(content)
+    list_depth = 0
+    list_parts: List[str] = []
+    
+    for i, token in enumerate(tokens):
+        if token.type in ('bullet_list_open', 'ordered_list_open'):
+            list_depth += 1
+        elif token.type in ('bullet_list_close', 'ordered_list_close'):
+            list_depth -= 1
+            if list_depth == 0:
+                # A list becomes a single block, like its <ul>/<ol> element would
+                yield token.tag, '\n'.join(list_parts)
+                list_parts = []
+        elif token.type == 'heading_open':
+            yield token.tag, _inline_text(tokens[i + 1])
+        elif token.type in ('paragraph_open', 'fence', 'code_block'):
+            if token.type == 'paragraph_open':
+                tag, text = 'p', _inline_text(tokens[i + 1])
+            else:
+                tag, text = 'pre', token.content
+            if list_depth:
+                list_parts.append(text)
+            else:
+                yield tag, text
+
+
+def parse_markdown(
+    content: str, stem: str, base_url: str, doc_name: Optional[str] = None
+) -> List[DocumentChunk]:
+    """Split markdown content into document chunks.
+    
+    Chunk ids are ``doc_name#N``, with ``doc_name`` defaulting to ``stem``. Kept at
+    module level so it can be shipped to a process pool worker.
+    """
+    id_prefix = (doc_name or stem) + '#'
+    chunks = []
+    chunks_append = chunks.append
+    current_section = ""
+    current_subsection = ""
+    
+    # Process headings and content straight from the markdown token stream
+    for tag, text in _iter_blocks(content):
+        level = _HEADING_LEVELS.get(tag)
+        if level is not None:
+            if level <= 2:
+                current_section = text.strip()
+                current_subsection = ""
+            elif level <= 4:
+                current_subsection = text.strip()
+        
+        # A block that is short before stripping can't be substantial after it
+        elif tag in _BLOCK_TAGS and len(text) > 50:
+            text_content = text.strip()
+            if len(text_content) > 50:  # Only include substantial content
+                chunk_id = id_prefix + str(len(chunks))
+                
+                # Determine tags based on content
+                tags = extract_tags(text_content, current_section)
+                
+                chunk = DocumentChunk(
+                    id=chunk_id,
+                    title=current_subsection or current_section or stem,
+                    content=text_content,
+                    url=base_url,
+                    section=current_section,
+                    # Stored as None rather than "", so it stays out of the indexed source
+                    subsection=current_subsection or None,
+                    tags=tags,
+                    embedding_text=' '.join((current_section, current_subsection, text_content))
+                )
+                chunks_append(chunk)
+    
+    return chunks
+
+
+def parse_markdown_file(
+    file_path: str,
+    base_url: str,
+    known_digest: Optional[int] = None,
+    doc_name: Optional[str] = None
+) -> Tuple[Tuple[int, int], int, Optional[List[DocumentChunk]]]:
+    """Read a markdown file and split it into document chunks.
+    
+    Returns the file's (mtime_ns, size) and content digest along with the chunks, or
+    with None when the digest equals ``known_digest`` and the caller's earlier chunks
+    still apply.
+    """
+    # Stat before reading, so a write in between leaves a stale stat and a re-read next time
+    stat = os.stat(file_path)
+    file_path_obj = Path(file_path)
+    content = file_path_obj.read_text(encoding='utf-8')
+    digest = xxhash.xxh3_128_intdigest(content.encode())
+    file_stat = (stat.st_mtime_ns, stat.st_size)
+    if digest == known_digest:
+        return file_stat, digest, None
+    return file_stat, digest, parse_markdown(content, file_path_obj.stem, base_url, doc_name)
+
+
+@lru_cache(maxsize=1024)
+def _section_tag(section: str) -> str:
+    """Turn a section heading into a tag; every chunk of a section asks for the same one."""
+    return _SECTION_STRIP_RE.sub('', section.lower()).replace(' ', '-')
+
+
+def extract_tags(content: str, section: str) -> List[str]:
+    """Extract relevant tags from content."""
+    if _TAG_DATABASE is not None:
+        # One SIMD scan for every rule at once
+        tags = _scan_tags(content)
+    else:
+        content_lower = content.lower()
+        
+        words = set(_WORD_RE.findall(content_lower))
+        
+        tags = {
+            tag for tag, substrings, whole_words, pattern in _TAG_RULES
+            if any(substring in content_lower for substring in substrings)
+            or not words.isdisjoint(whole_words)
+            or (pattern is not None and pattern.search(content_lower))
+        }
+    
+    # Section-based tags
+    if section:
+        section_tag = _section_tag(section)
+        if section_tag:
+            tags.add(section_tag)
+    
+    return list(tags)
+
 
 class FastAPIDocumentProcessor(IDocumentProcessor):
     """Processes FastAPI documentation files."""
     
-    def __init__(self, base_docs_url: str = "https://fastapi.tiangolo.com"):
+    def __init__(
+        self,
+        base_docs_url: str = "https://fastapi.tiangolo.com",
+        executor: Optional[Executor] = None
+    ):
         self.base_docs_url = base_docs_url
+        # Parsing is CPU-bound; pass a ProcessPoolExecutor to spread it across cores.
+        # None falls back to the event loop's default thread pool.
+        self.executor = executor
+        # Chunks from the last load by file path, with the base URL and document name, file
+        # stat and content digest they were built from; refreshes only re-parse files that
+        # changed
+        self._parse_cache: Dict[
+            str, Tuple[Tuple[str, Optional[str]], Tuple[int, int], int, List[DocumentChunk]]
+        ] = {}
     
-    async def process_markdown_file(self, file_path: str, base_url: str) -> List[DocumentChunk]:
+    async def process_markdown_file(
+        self, file_path: str, base_url: str, doc_name: Optional[str] = None
+    ) -> List[DocumentChunk]:
         """Process a single markdown file into document chunks."""
-        file_path_obj = Path(file_path)
-        
-        async with aiofiles.open(file_path_obj, 'r', encoding='utf-8') as f:
-            content = await f.read()
-        
-        # Convert markdown to HTML for better parsing
-        html_content = markdown(content, extensions=['toc', 'codehilite'])
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        chunks = []
-        current_section = ""
-        current_subsection = ""
+        cached = self._parse_cache.get(file_path)
+        if cached is not None and cached[0] != (base_url, doc_name):
+            cached = None
         
-        # Process headings and content
-        for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'pre', 'ul', 'ol']):
-            if element.name.startswith('h'):
-                level = int(element.name[1])
-                if level <= 2:
-                    current_section = element.get_text().strip()
-                    current_subsection = ""
-                elif level <= 4:
-                    current_subsection = element.get_text().strip()
-            
-            elif element.name in ['p', 'pre', 'ul', 'ol']:
-                text_content = element.get_text().strip()
-                if len(text_content) > 50:  # Only include substantial content
-                    chunk_id = f"{file_path_obj.stem}#{len(chunks)}"
-                    
-                    # Determine tags based on content
-                    tags = self.extract_tags(text_content, current_section)
-                    
-                    chunk = DocumentChunk(
-                        id=chunk_id,
-                        title=current_subsection or current_section or str(file_path_obj.stem),
-                        content=text_content,
-                        url=base_url,
-                        section=current_section,
-                        subsection=current_subsection,
-                        tags=tags,
-                        embedding_text=f"{current_section} {current_subsection} {text_content}"
-                    )
-                    chunks.append(chunk)
+        if cached is not None:
+            # A git checkout only rewrites files it changes, so an unchanged modification
+            # time and size means unchanged content, without reading the file at all
+            stat = await asyncio.to_thread(os.stat, file_path)
+            if (stat.st_mtime_ns, stat.st_size) == cached[1]:
+                return list(cached[3])
         
-        return chunks
+        # Stat, read, hash and parse in one executor hop rather than dispatching each
+        # call separately
+        loop = asyncio.get_running_loop()
+        file_stat, digest, chunks = await loop.run_in_executor(
+            self.executor, parse_markdown_file, file_path, base_url,
+            cached[2] if cached is not None else None, doc_name
+        )
+        if chunks is None:
+            # Touched but not modified; the digest shows the earlier chunks still apply
+            chunks = cached[3]
+        self._parse_cache[file_path] = ((base_url, doc_name), file_stat, digest, chunks)
+        return list(chunks)
     
     def extract_tags(self, content: str, section: str) -> List[str]:
         """Extract relevant tags from content."""
-        tags = []
-        content_lower = content.lower()
-        section_lower = section.lower()
-        
-        # API-related tags
-        tag_patterns = {
-            'api': [r'@app\.', r'router', r'endpoint', r'path'],
-            'http-methods': [r'\b(get|post|put|delete|patch)\b'],
-            'pydantic': [r'pydantic', r'basemodel'],
-            'async': [r'\basync\b', r'\bawait\b'],
-            'dependencies': [r'dependency', r'depends'],
-            'security': [r'security', r'\bauth\b'],
-            'database': [r'database', r'\bsql\b'],
-            'testing': [r'\btest\b'],
-            'deployment': [r'deploy', r'docker'],
-            'validation': [r'validat', r'schema'],
-            'middleware': [r'middleware'],
-            'cors': [r'\bcors\b'],
-            'websocket': [r'websocket'],
-            'background-tasks': [r'background.*task'],
-            'file-upload': [r'file.*upload', r'uploadfile'],
-        }
-        
-        for tag, patterns in tag_patterns.items():
-            if any(re.search(pattern, content_lower) for pattern in patterns):
-                tags.append(tag)
-        
-        # Section-based tags
-        if section_lower:
-            section_tag = re.sub(r'[^\w\s-]', '', section_lower).replace(' ', '-')
-            if section_tag:
-                tags.append(section_tag)
-        
-        return list(set(tags))  # Remove duplicates
+        return extract_tags(content, section)
@@ -3,11 +3,12 @@ Interfaces and abstract base classes following SOLID principles.
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Union
 
 
-class DocumentChunk(BaseModel):
+@dataclass(slots=True, kw_only=True, frozen=True)
+class DocumentChunk:
     """Represents a chunk of documentation."""
     id: str
     title: str
@@ -15,7 +16,7 @@ class DocumentChunk(BaseModel):
     url: str
     section: str
     subsection: Optional[str] = None
-    tags: List[str] = []
+    tags: List[str] = field(default_factory=list)
     embedding_text: str
 
 
@@ -32,6 +33,11 @@ class IDocumentFetcher(ABC):
         """Extract documents from the repository."""
         pass
     
+    @abstractmethod
+    def iter_documents(self) -> AsyncIterator[DocumentChunk]:
+        """Yield documents from the repository as they are extracted."""
+        pass
+    
     @abstractmethod
     async def close(self) -> None:
         """Clean up resources."""
@@ -47,8 +53,10 @@ class ISearchEngine(ABC):
         pass
     
     @abstractmethod
-    async def index_documents(self, documents: List[DocumentChunk]) -> None:
-        """Index documents in the search engine."""
+    async def index_documents(
+        self, documents: Union[Iterable[DocumentChunk], AsyncIterable[DocumentChunk]]
+    ) -> int:
+        """Index documents in the search engine and return how many were indexed."""
         pass
     
     @abstractmethod
@@ -56,11 +64,22 @@ class ISearchEngine(ABC):
         self, 
         query: str, 
         tags: Optional[List[str]] = None,
-        size: int = 10
+        size: int = 10,
+        preference: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Search documents."""
         pass
     
+    @abstractmethod
+    async def clear_result_cache(self) -> None:
+        """Invalidate any cached search results."""
+        pass
+    
+    @abstractmethod
+    async def clear_doc_cache(self) -> None:
+        """Invalidate any cached documents."""
+        pass
+    
     @abstractmethod
     async def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific document by ID."""
@@ -76,8 +95,14 @@ class IDocumentProcessor(ABC):
     """Interface for document processing operations."""
     
     @abstractmethod
-    async def process_markdown_file(self, file_path: str, base_url: str) -> List[DocumentChunk]:
-        """Process a markdown file into document chunks."""
+    async def process_markdown_file(
+        self, file_path: str, base_url: str, doc_name: Optional[str] = None
+    ) -> List[DocumentChunk]:
+        """Process a markdown file into document chunks.
+        
+        ``doc_name`` prefixes the chunk ids and must be unique per file, e.g. the path
+        under the docs root; it defaults to the file name without its suffix.
+        """
         pass
     
     @abstractmethod
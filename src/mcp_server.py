@@ -2,15 +2,71 @@
 FastAPI MCP Server implementation following SOLID principles.
 """
 
+import hashlib
 import logging
 from typing import Any, Dict, List, Optional
 
 from fastmcp import FastMCP
+from fastmcp.server.dependencies import get_context
 
 from .interfaces import IDataLoader, ISearchEngine
 
 logger = logging.getLogger(__name__)
 
+# Tags assigned by the document processor, with descriptions for MCP clients
+_AVAILABLE_TAGS: Dict[str, str] = {
+    "api": "API endpoints and routing",
+    "http-methods": "HTTP methods (GET, POST, PUT, DELETE, etc.)",
+    "pydantic": "Pydantic models and validation",
+    "async": "Asynchronous programming",
+    "dependencies": "Dependency injection",
+    "security": "Authentication and authorization",
+    "database": "Database integration",
+    "testing": "Testing FastAPI applications",
+    "deployment": "Deployment and Docker",
+    "validation": "Data validation and schemas",
+    "middleware": "Middleware components",
+    "cors": "Cross-Origin Resource Sharing",
+    "websocket": "WebSocket connections",
+    "background-tasks": "Background task processing",
+    "file-upload": "File upload handling"
+}
+
+
+def _format_hit(hit: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn an Elasticsearch hit into a search tool result."""
+    source = hit["_source"]
+    result = {
+        "id": source["id"],
+        "title": source["title"],
+        "section": source["section"],
+        "subsection": source.get("subsection"),
+        "url": source["url"],
+        "tags": source["tags"],
+        "score": hit["_score"],
+        # Already trimmed to a preview by the search engine
+        "content": source["content"]
+    }
+    
+    highlight = hit.get("highlight")
+    if highlight:
+        result["highlights"] = highlight
+    
+    return result
+
+
+def _search_preference() -> Optional[str]:
+    """Derive a stable Elasticsearch search preference from the current MCP client."""
+    try:
+        ctx = get_context()
+        client_key = ctx.client_id or ctx.session_id
+    except Exception:
+        # No active request context (e.g. tools called directly)
+        return None
+    if not client_key:
+        return None
+    return hashlib.blake2b(client_key.encode(), digest_size=8).hexdigest()
+
 
 class FastAPIMCPServer:
     """MCP Server for FastAPI documentation."""
@@ -36,121 +92,99 @@ class FastAPIMCPServer:
     
     def _register_tools(self):
         """Register MCP tools."""
+        # Tools are bound methods rather than closures rebuilt for every server
+        for tool in (
+            self.search_fastapi_docs,
+            self.get_fastapi_doc_by_id,
+            self.refresh_fastapi_docs,
+            self.get_available_tags
+        ):
+            self.mcp.tool(tool)
+    
+    async def search_fastapi_docs(
+        self,
+        query: str,
+        tags: Optional[List[str]] = None,
+        max_results: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Search FastAPI documentation using semantic search.
         
-        @self.mcp.tool
-        async def search_fastapi_docs(
-            query: str,
-            tags: Optional[List[str]] = None,
-            max_results: int = 10
-        ) -> Dict[str, Any]:
-            """
-            Search FastAPI documentation using semantic search.
-            
-            Args:
-                query: Search query (e.g., "how to create API endpoints", "pydantic models", "async dependencies")
-                tags: Optional list of tags to filter by (api, pydantic, async, dependencies, security, database, testing, deployment)
-                max_results: Maximum number of results to return (default: 10)
-            
-            Returns:
-                Dictionary containing search results with highlighted content
-            """
-            try:
-                results = await self.search_engine.search_documents(query, tags, max_results)
-                
-                formatted_results = []
-                for hit in results:
-                    source = hit["_source"]
-                    highlight = hit.get("highlight", {})
-                    
-                    result = {
-                        "id": source["id"],
-                        "title": source["title"],
-                        "section": source["section"],
-                        "subsection": source.get("subsection"),
-                        "url": source["url"],
-                        "tags": source["tags"],
-                        "score": hit["_score"],
-                        "content": source["content"][:500] + "..." if len(source["content"]) > 500 else source["content"]
-                    }
-                    
-                    if highlight:
-                        result["highlights"] = highlight
-                    
-                    formatted_results.append(result)
-                
-                return {
-                    "query": query,
-                    "total_results": len(formatted_results),
-                    "results": formatted_results
-                }
-            except Exception as e:
-                logger.error(f"Search failed: {e}")
-                return {"error": f"Search failed: {str(e)}"}
-
-        @self.mcp.tool
-        async def get_fastapi_doc_by_id(doc_id: str) -> Dict[str, Any]:
-            """
-            Get a specific FastAPI documentation section by its ID.
-            
-            Args:
-                doc_id: The document ID from search results
-            
-            Returns:
-                Complete document content
-            """
-            try:
-                doc = await self.search_engine.get_document_by_id(doc_id)
-                if doc:
-                    return doc
-                else:
-                    return {"error": f"Document with ID '{doc_id}' not found"}
-            except Exception as e:
-                logger.error(f"Failed to get document: {e}")
-                return {"error": f"Failed to get document: {str(e)}"}
-
-        @self.mcp.tool
-        async def refresh_fastapi_docs() -> Dict[str, Any]:
-            """
-            Refresh the FastAPI documentation by fetching the latest version from GitHub
-            and re-indexing it in Elasticsearch.
+        Args:
+            query: Search query (e.g., "how to create API endpoints", "pydantic models", "async dependencies")
+            tags: Optional list of tags to filter by (api, pydantic, async, dependencies, security, database, testing, deployment)
+            max_results: Maximum number of results to return (default: 10)
+        
+        Returns:
+            Dictionary containing search results with highlighted content
+        """
+        try:
+            results = await self.search_engine.search_documents(
+                query, tags, max_results, preference=_search_preference()
+            )
             
-            Returns:
-                Status of the refresh operation
-            """
-            return await self.data_loader.refresh_data()
-
-        @self.mcp.tool
-        async def get_available_tags() -> Dict[str, Any]:
-            """
-            Get all available tags that can be used for filtering searches.
+            formatted_results = [_format_hit(hit) for hit in results]
             
-            Returns:
-                List of available tags with descriptions
-            """
             return {
-                "tags": {
-                    "api": "API endpoints and routing",
-                    "http-methods": "HTTP methods (GET, POST, PUT, DELETE, etc.)",
-                    "pydantic": "Pydantic models and validation",
-                    "async": "Asynchronous programming",
-                    "dependencies": "Dependency injection",
-                    "security": "Authentication and authorization",
-                    "database": "Database integration",
-                    "testing": "Testing FastAPI applications",
-                    "deployment": "Deployment and Docker",
-                    "validation": "Data validation and schemas",
-                    "middleware": "Middleware components",
-                    "cors": "Cross-Origin Resource Sharing",
-                    "websocket": "WebSocket connections",
-                    "background-tasks": "Background task processing",
-                    "file-upload": "File upload handling"
-                }
+                "query": query,
+                "total_results": len(formatted_results),
+                "results": formatted_results
             }
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            return {"error": f"Search failed: {str(e)}"}
+    
+    async def get_fastapi_doc_by_id(self, doc_id: str) -> Dict[str, Any]:
+        """
+        Get a specific FastAPI documentation section by its ID.
+        
+        Args:
+            doc_id: The document ID from search results
+        
+        Returns:
+            Complete document content
+        """
+        try:
+            doc = await self.search_engine.get_document_by_id(doc_id)
+            if doc:
+                return doc
+            else:
+                return {"error": f"Document with ID '{doc_id}' not found"}
+        except Exception as e:
+            logger.error(f"Failed to get document: {e}")
+            return {"error": f"Failed to get document: {str(e)}"}
+    
+    async def refresh_fastapi_docs(self) -> Dict[str, Any]:
+        """
+        Refresh the FastAPI documentation by fetching the latest version from GitHub
+        and re-indexing it in Elasticsearch.
+        
+        Returns:
+            Status of the refresh operation
+        """
+        result = await self.data_loader.refresh_data()
+        # Results and documents cached before the refresh may no longer match the index
+        await self.search_engine.clear_result_cache()
+        await self.search_engine.clear_doc_cache()
+        return result
+    
+    async def get_available_tags(self) -> Dict[str, Any]:
+        """
+        Get all available tags that can be used for filtering searches.
+        
+        Returns:
+            List of available tags with descriptions
+        """
+        return {"tags": _AVAILABLE_TAGS}
     
     def run(self):
         """Run the MCP server."""
         self.mcp.run()
     
+    async def run_async(self):
+        """Run the MCP server on the current event loop."""
+        await self.mcp.run_async()
+    
     async def close(self):
         """Close server resources."""
         await self.search_engine.close()
@@ -2,100 +2,354 @@
 Search engine implementation using Elasticsearch following SOLID principles.
 """
 
+import asyncio
+import copy
 import logging
+import os
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Set, Sized, Tuple, Union
+)
 
+import xxhash
+from cachetools import TTLCache
 from elasticsearch import AsyncElasticsearch
-from elasticsearch.helpers import async_bulk
+from elasticsearch.helpers import async_streaming_bulk
+from elasticsearch.serializer import OrjsonSerializer
 
 from .interfaces import DocumentChunk, ISearchEngine
 
 logger = logging.getLogger(__name__)
 
+# One client (and connection pool) per Elasticsearch URL, shared by every engine in the
+# process; closed by shutdown_all()
+_CLIENTS: Dict[str, AsyncElasticsearch] = {}
+
+# Index settings while a bulk load is running: no periodic refresh and no fsync per
+# bulk request. Applied before every load, since an existing index is reused.
+_BULK_LOAD_SETTINGS = {
+    "refresh_interval": "-1",
+    "translog.durability": "async",
+    "translog.flush_threshold_size": "1gb"
+}
+
+# Index settings restored once a bulk load is done
+_SERVING_SETTINGS = {
+    "refresh_interval": "5s",
+    "translog.durability": "request"
+}
+
+# Built once; create_index also compares live mappings against it to decide on reuse
+_INDEX_MAPPING = {
+    "mappings": {
+        "properties": {
+            "id": {"type": "keyword"},
+            "title": {"type": "text", "analyzer": "standard"},
+            "content": {"type": "text", "analyzer": "standard"},
+            "url": {"type": "keyword"},
+            "section": {"type": "text", "analyzer": "standard"},
+            "subsection": {"type": "text", "analyzer": "standard"},
+            "tags": {"type": "keyword"},
+            "embedding_text": {"type": "text", "analyzer": "standard"},
+            "indexed_at": {"type": "date"}
+        }
+    },
+    "settings": {
+        "number_of_shards": 1,
+        "number_of_replicas": 0,
+        "translog.sync_interval": "30s",
+        "translog.flush_threshold_size": "1gb",
+        **_SERVING_SETTINGS
+    }
+}
+
+# Search results only preview a chunk's content; trimming it in Elasticsearch keeps
+# full chunks out of the response
+_PREVIEW_CHARS = 500
+_CONTENT_PREVIEW_SCRIPT = {
+    "source": (
+        "def c = params._source.content; "
+        "return c == null || c.length() <= params.chars ? c : c.substring(0, params.chars) + '...'"
+    ),
+    "params": {"chars": _PREVIEW_CHARS}
+}
+
+
+async def _aiter(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    """Iterate a plain or async iterable asynchronously."""
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
 
 class ElasticsearchEngine(ISearchEngine):
     """Elasticsearch implementation of the search engine interface."""
     
-    def __init__(self, url: str, index_name: str):
-        self.es = AsyncElasticsearch([url])
+    def __init__(
+        self,
+        url: str,
+        index_name: str,
+        chunk_size: int = 1000,
+        max_chunk_bytes: int = 5 * 1024 * 1024,
+        concurrency: Optional[int] = None,
+        result_cache_size: int = 1024,
+        result_cache_ttl: float = 300,
+        doc_cache_size: int = 4096,
+        doc_cache_ttl: float = 600,
+        search_batch_window: float = 0.002
+    ):
+        self.es = _CLIENTS.get(url)
+        if self.es is None:
+            self.es = _CLIENTS[url] = AsyncElasticsearch(
+                [url],
+                # orjson also serializes each bulk action line, which dominates client CPU on loads
+                serializer=OrjsonSerializer(),
+                # Room for every concurrent bulk worker plus searches; the default pool is 10
+                connections_per_node=32,
+                # Doc chunks are text-heavy JSON and compress well on the wire
+                http_compress=True,
+                request_timeout=60,
+                retry_on_timeout=True,
+                max_retries=3
+            )
         self.index_name = index_name
+        # Bulk request sizing; doc chunks are a few KB, so chunk_size is the binding limit
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        # Concurrent bulk requests, enough to keep the cluster's indexing threads busy
+        self.concurrency = concurrency or min((os.cpu_count() or 1) * 3, 12)
+        # Assistants tend to repeat the same searches; serve those without a round-trip
+        self._result_cache: TTLCache = TTLCache(maxsize=result_cache_size, ttl=result_cache_ttl)
+        # Documents opened from search results; the same top hits get fetched repeatedly
+        self._doc_cache: TTLCache = TTLCache(maxsize=doc_cache_size, ttl=doc_cache_ttl)
+        # While a search request is in flight, searches arriving within this window of each
+        # other share one msearch request
+        self.search_batch_window = search_batch_window
+        self._pending_searches: List[Tuple[Dict[str, Any], Optional[str], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._search_tasks: Set[asyncio.Task] = set()
+        self._searches_in_flight = 0
     
     async def create_index(self) -> None:
         """Create the Elasticsearch index with proper mapping."""
-        mapping = {
-            "mappings": {
-                "properties": {
-                    "id": {"type": "keyword"},
-                    "title": {"type": "text", "analyzer": "standard"},
-                    "content": {"type": "text", "analyzer": "standard"},
-                    "url": {"type": "keyword"},
-                    "section": {"type": "text", "analyzer": "standard"},
-                    "subsection": {"type": "text", "analyzer": "standard"},
-                    "tags": {"type": "keyword"},
-                    "embedding_text": {"type": "text", "analyzer": "standard"},
-                    "indexed_at": {"type": "date"}
-                }
-            },
-            "settings": {
-                "number_of_shards": 1,
-                "number_of_replicas": 0
-            }
-        }
+        await self.clear_result_cache()
+        await self.clear_doc_cache()
         
         try:
-            # Check if index exists and delete if it does
-            try:
-                await self.es.indices.get(index=self.index_name)
+            # Reuse an existing index unless its mapping is out of date; reloads then
+            # overwrite documents by id instead of rebuilding the whole index
+            if await self.es.indices.exists(index=self.index_name):
+                current = await self.es.indices.get_mapping(index=self.index_name)
+                if current[self.index_name]["mappings"] == _INDEX_MAPPING["mappings"]:
+                    logger.info(f"Index {self.index_name} is up to date, reusing it")
+                    return
                 await self.es.indices.delete(index=self.index_name)
-                logger.info(f"Deleted existing index: {self.index_name}")
-            except Exception:
-                # Index doesn't exist, which is fine
-                pass
+                logger.info(f"Deleted index with outdated mapping: {self.index_name}")
             
             # Create index with mapping and settings
             await self.es.indices.create(
                 index=self.index_name,
-                body=mapping
+                body=_INDEX_MAPPING
             )
             logger.info(f"Created index: {self.index_name}")
         except Exception as e:
             logger.error(f"Failed to create index: {e}")
-            logger.error(f"Index mapping: {mapping}")
+            logger.error(f"Index mapping: {_INDEX_MAPPING}")
             raise
     
-    async def index_documents(self, documents: List[DocumentChunk]) -> None:
-        """Index documents in Elasticsearch."""
-        actions = []
-        for doc in documents:
-            action = {
-                "_index": self.index_name,
-                "_id": doc.id,
-                "_source": {
-                    **doc.model_dump(),
-                    "indexed_at": datetime.utcnow().isoformat()
-                }
-            }
-            actions.append(action)
+    async def index_documents(
+        self, documents: Union[Iterable[DocumentChunk], AsyncIterable[DocumentChunk]]
+    ) -> int:
+        """Index documents in Elasticsearch.
+        
+        Documents may be a list or an async stream; a stream is indexed while it is still
+        being produced. Returns the number of documents indexed, leaving out duplicates
+        and documents Elasticsearch rejected.
+        """
+        # One load gets one timestamp; actions are built lazily as each worker streams them
+        indexed_at = datetime.utcnow().isoformat()
+        
+        workers = self.concurrency
+        if isinstance(documents, Sized):
+            workers = max(1, min(workers, len(documents)))
+        # Bounded, so a fast producer can't run far ahead of the bulk workers
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.chunk_size * workers)
+        # Large bulk requests can outlast the client's default timeout
+        bulk_client = self.es.options(request_timeout=120)
         
         try:
-            success, failed = await async_bulk(self.es, actions)
+            await self.es.indices.put_settings(
+                index=self.index_name,
+                settings={"index": _BULK_LOAD_SETTINGS}
+            )
+            try:
+                tasks = [asyncio.create_task(self._enqueue_unique(documents, queue, workers))]
+                tasks += [
+                    asyncio.create_task(self._bulk_worker(bulk_client, queue, indexed_at))
+                    for _ in range(workers)
+                ]
+                try:
+                    (received, unique), *results = await asyncio.gather(*tasks)
+                finally:
+                    # A failed worker must not leave the producer blocked on a full queue
+                    for task in tasks:
+                        task.cancel()
+            finally:
+                # Restore serving settings even if the load failed part-way
+                await self.es.indices.put_settings(
+                    index=self.index_name,
+                    settings={"index": _SERVING_SETTINGS}
+                )
+            if received > unique:
+                logger.info(f"Skipped {received - unique} duplicate chunks")
+            failed = [error for errors in results for error in errors]
+            success = unique - len(failed)
             logger.info(f"Indexed {success} documents, {len(failed)} failed")
+            if failed:
+                logger.warning(f"First bulk indexing error: {failed[0]}")
+            
+            if not unique:
+                # Without new documents, the cleanup below would empty the index
+                logger.warning("No documents to index, keeping the existing ones")
+                return success
+            
+            # Make the new documents searchable
+            await self.es.indices.refresh(index=self.index_name)
+            
+            if failed:
+                # A rejected document keeps its old timestamp, so the cleanup below would
+                # delete it rather than leave it stale
+                logger.error(
+                    f"Skipping removal of stale documents because {len(failed)} documents "
+                    f"failed to index"
+                )
+            else:
+                # Anything not rewritten by this load is left over from an earlier one
+                await self.es.delete_by_query(
+                    index=self.index_name,
+                    query={"range": {"indexed_at": {"lt": indexed_at}}},
+                    conflicts="proceed"
+                )
+            
+            # Compact the freshly written segments
+            await self.es.indices.forcemerge(index=self.index_name, max_num_segments=1)
+            
+            # Results and documents cached while the load was in flight are stale now
+            await self.clear_result_cache()
+            await self.clear_doc_cache()
+            return success
         except Exception as e:
             logger.error(f"Failed to index documents: {e}")
             raise
     
+    @staticmethod
+    async def _enqueue_unique(
+        documents: Union[Iterable[DocumentChunk], AsyncIterable[DocumentChunk]],
+        queue: asyncio.Queue,
+        workers: int
+    ) -> Tuple[int, int]:
+        """Queue documents whose content wasn't seen yet, then a stop marker per worker.
+        
+        Identical chunks (shared snippets, repeated notes) only need to be indexed once;
+        the first occurrence is kept. Returns the received and queued counts.
+        """
+        seen = set()
+        seen_ids = set()
+        received = 0
+        async for doc in _aiter(documents):
+            received += 1
+            digest = xxhash.xxh3_64_intdigest(doc.content.encode())
+            if digest not in seen:
+                seen.add(digest)
+                if doc.id in seen_ids:
+                    # Bulk workers send concurrently, so which copy survives is arbitrary
+                    logger.warning(f"Duplicate document id {doc.id}, only one copy is kept")
+                seen_ids.add(doc.id)
+                await queue.put(doc)
+        for _ in range(workers):
+            await queue.put(None)
+        return received, len(seen)
+    
+    async def _bulk_worker(
+        self, client: AsyncElasticsearch, queue: asyncio.Queue, indexed_at: str
+    ) -> List[Dict[str, Any]]:
+        """Stream queued documents to Elasticsearch and return the failed items."""
+        failed = []
+        # Only failures are yielded; rejected chunks (429) are retried with backoff first
+        async for _, item in async_streaming_bulk(
+            client,
+            self._queued_actions(queue, indexed_at),
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            max_retries=3,
+            initial_backoff=2,
+            raise_on_error=False,
+            yield_ok=False
+        ):
+            failed.append(item)
+        return failed
+    
+    async def _queued_actions(
+        self, queue: asyncio.Queue, indexed_at: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield bulk index actions for queued documents until the stop marker."""
+        while (doc := await queue.get()) is not None:
+            source = {
+                "id": doc.id,
+                "title": doc.title,
+                "content": doc.content,
+                "url": doc.url,
+                "section": doc.section,
+                "subsection": doc.subsection,
+                "tags": doc.tags,
+                "embedding_text": doc.embedding_text,
+                "indexed_at": indexed_at
+            }
+            # Elasticsearch treats a missing field like null, so don't ship the nulls
+            if doc.subsection is None:
+                del source["subsection"]
+            yield {
+                "_index": self.index_name,
+                "_id": doc.id,
+                "_source": source
+            }
+    
     async def search_documents(
         self, 
         query: str, 
         tags: Optional[List[str]] = None,
-        size: int = 10
+        size: int = 10,
+        preference: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Search documents in Elasticsearch."""
+        """Search documents in Elasticsearch.
+        
+        Hits carry their metadata and a content preview rather than the full chunk: the
+        first 500 characters, followed by "..." when the content is longer. A stable
+        ``preference`` routes a session's searches to the same shard copies, keeping
+        their request and query caches warm.
+        """
+        cache_key = (query, tuple(sorted(tags or ())), size)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            # Cached hits are never handed out directly, so callers can't alter later results
+            return copy.deepcopy(cached)
+        
         search_body = {
             "query": {
                 "bool": {
-                    "must": [
+                    # Exact and fuzzy matching are separate clauses: exact hits score on
+                    # both and rank first, while typo'd queries still match via the fuzzy one
+                    "should": [
+                        {
+                            "multi_match": {
+                                "query": query,
+                                "fields": ["title^2", "content", "section^1.5", "subsection^1.5"],
+                                "type": "best_fields"
+                            }
+                        },
                         {
                             "multi_match": {
                                 "query": query,
@@ -104,7 +358,8 @@ class ElasticsearchEngine(ISearchEngine):
                                 "fuzziness": "AUTO"
                             }
                         }
-                    ]
+                    ],
+                    "minimum_should_match": 1
                 }
             },
             "highlight": {
@@ -115,30 +370,146 @@ class ElasticsearchEngine(ISearchEngine):
                     "subsection": {}
                 }
             },
+            "_source": {"includes": ["id", "title", "section", "subsection", "url", "tags"]},
+            "script_fields": {"content": {"script": _CONTENT_PREVIEW_SCRIPT}},
+            # Only the top hits are used, so skip counting every match
+            "track_total_hits": False,
             "size": size
         }
         
         if tags:
+            # Filter context is cached per segment; sorting keeps the request body stable
             search_body["query"]["bool"]["filter"] = [
-                {"terms": {"tags": tags}}
+                {"terms": {"tags": sorted(tags)}}
             ]
         
         try:
-            response = await self.es.search(index=self.index_name, body=search_body)
-            return response["hits"]["hits"]
+            response = await self._submit_search(search_body, preference)
+            hits = response["hits"]["hits"]
+            for hit in hits:
+                hit["_source"]["content"] = hit.pop("fields")["content"][0]
+            self._result_cache[cache_key] = copy.deepcopy(hits)
+            return hits
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
     
+    def _submit_search(
+        self, search_body: Dict[str, Any], preference: Optional[str]
+    ) -> asyncio.Future:
+        """Queue a search for the next batch and return a future for its response."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending_searches.append((search_body, preference, future))
+        if self._flush_task is None:
+            # Only hold a search back to batch it while another request is in flight;
+            # searches submitted in the same loop iteration are batched either way
+            delay = self.search_batch_window if self._searches_in_flight else 0
+            self._flush_task = asyncio.create_task(self._flush_searches(delay))
+            # The loop only keeps weak references to tasks
+            self._search_tasks.add(self._flush_task)
+            self._flush_task.add_done_callback(self._search_tasks.discard)
+        return future
+    
+    async def _flush_searches(self, delay: float) -> None:
+        """Send every queued search, as one msearch request when there are several."""
+        pending = []
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            pending, self._pending_searches = self._pending_searches, []
+            self._flush_task = None
+            
+            self._searches_in_flight += 1
+            try:
+                responses = await self._send_searches(pending)
+            finally:
+                self._searches_in_flight -= 1
+        except BaseException as e:
+            if not pending:
+                # Cancelled while waiting for the batch to fill
+                pending, self._pending_searches = self._pending_searches, []
+                self._flush_task = None
+            # Callers await their futures, so every exit has to settle them, cancellation too
+            error = e if isinstance(e, Exception) else Exception("Search was cancelled")
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(e, Exception):
+                raise
+            return
+        
+        for (_, _, future), response in zip(pending, responses):
+            if future.done():
+                continue
+            # msearch reports per-search failures inline instead of raising
+            if "error" in response:
+                future.set_exception(Exception(response["error"]))
+            else:
+                future.set_result(response)
+    
+    async def _send_searches(
+        self, pending: List[Tuple[Dict[str, Any], Optional[str], asyncio.Future]]
+    ) -> List[Dict[str, Any]]:
+        """Send a batch of searches and return their responses in order."""
+        if len(pending) == 1:
+            search_body, preference, _ = pending[0]
+            # Hits are only kept in the shard request cache when asked for explicitly
+            return [await self.es.search(
+                index=self.index_name,
+                body=search_body,
+                preference=preference,
+                search_type="query_then_fetch",
+                request_cache=True
+            )]
+        
+        searches = []
+        for search_body, preference, _ in pending:
+            header = {
+                "index": self.index_name,
+                "search_type": "query_then_fetch",
+                "request_cache": True
+            }
+            if preference:
+                header["preference"] = preference
+            searches.append(header)
+            searches.append(search_body)
+        response = await self.es.msearch(searches=searches)
+        return response["responses"]
+    
+    async def clear_result_cache(self) -> None:
+        """Drop all cached search results."""
+        self._result_cache.clear()
+    
+    async def clear_doc_cache(self) -> None:
+        """Drop all cached documents."""
+        self._doc_cache.clear()
+    
     async def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific document by ID."""
+        cached = self._doc_cache.get(doc_id)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
         try:
             response = await self.es.get(index=self.index_name, id=doc_id)
-            return response["_source"]
+            document = response["_source"]
+            self._doc_cache[doc_id] = copy.deepcopy(document)
+            return document
         except Exception as e:
             logger.error(f"Failed to get document {doc_id}: {e}")
             return None
     
     async def close(self):
-        """Close the Elasticsearch connection."""
-        await self.es.close()
+        """Release the engine.
+        
+        The Elasticsearch client is shared process-wide, so it stays open until
+        shutdown_all() is called.
+        """
+
+
+async def shutdown_all() -> None:
+    """Close every shared Elasticsearch client."""
+    clients = list(_CLIENTS.values())
+    _CLIENTS.clear()
+    for client in clients:
+        await client.close()
@@ -4,9 +4,10 @@ Pytest configuration and fixtures.
 
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from pathlib import Path
 
+from src import search_engine
 from src.interfaces import DocumentChunk
 
 
@@ -18,6 +19,30 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def reset_shared_clients():
+    """Give every test its own Elasticsearch client instead of a cached one."""
+    search_engine._CLIENTS.clear()
+    yield
+    search_engine._CLIENTS.clear()
+
+
+@pytest.fixture
+def mock_streaming_bulk():
+    """Patch async_streaming_bulk with a stand-in that records every streamed action."""
+    indexed = []
+    
+    async def streaming_bulk(client, actions, **kwargs):
+        async for action in actions:
+            indexed.append(action)
+        return
+        yield
+    
+    with patch('src.search_engine.async_streaming_bulk', side_effect=streaming_bulk) as mock_bulk:
+        mock_bulk.indexed = indexed
+        yield mock_bulk
+
+
 @pytest.fixture
 def sample_document_chunk():
     """Sample document chunk for testing."""
@@ -3,11 +3,17 @@ Tests for data loader.
 """
 
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 from src.data_loader import FastAPIDataLoader
 
 
+async def _stream(*documents):
+    """Yield documents like FastAPIDocumentFetcher.iter_documents."""
+    for doc in documents:
+        yield doc
+
+
 @pytest.mark.asyncio
 class TestFastAPIDataLoader:
     """Test cases for FastAPIDataLoader."""
@@ -21,9 +27,9 @@ class TestFastAPIDataLoader:
     async def test_load_data_success(self, sample_document_chunk):
         """Test successful data loading."""
         self.mock_fetcher.clone_or_update_repo.return_value = None
-        self.mock_fetcher.extract_documents.return_value = [sample_document_chunk]
+        self.mock_fetcher.iter_documents = MagicMock(return_value=_stream(sample_document_chunk))
         self.mock_search_engine.create_index.return_value = None
-        self.mock_search_engine.index_documents.return_value = None
+        self.mock_search_engine.index_documents.return_value = 1
         
         result = await self.data_loader.load_data()
         
@@ -32,19 +38,20 @@ class TestFastAPIDataLoader:
         assert "Successfully loaded 1 documentation chunks" in result["message"]
         
         self.mock_fetcher.clone_or_update_repo.assert_called_once()
-        self.mock_fetcher.extract_documents.assert_called_once()
+        self.mock_fetcher.iter_documents.assert_called_once()
         self.mock_search_engine.create_index.assert_called_once()
         self.mock_search_engine.index_documents.assert_called_once()
     
     async def test_load_data_no_documents(self):
         """Test data loading when no documents are found."""
         self.mock_fetcher.clone_or_update_repo.return_value = None
-        self.mock_fetcher.extract_documents.return_value = []
+        self.mock_fetcher.iter_documents = MagicMock(return_value=_stream())
         
         result = await self.data_loader.load_data()
         
         assert "error" in result
         assert result["error"] == "No documents found in repository"
+        self.mock_search_engine.create_index.assert_not_called()
     
     async def test_load_data_fetcher_error(self):
         """Test data loading when fetcher fails."""
@@ -58,7 +65,7 @@ class TestFastAPIDataLoader:
     async def test_load_data_search_engine_error(self, sample_document_chunk):
         """Test data loading when search engine fails."""
         self.mock_fetcher.clone_or_update_repo.return_value = None
-        self.mock_fetcher.extract_documents.return_value = [sample_document_chunk]
+        self.mock_fetcher.iter_documents = MagicMock(return_value=_stream(sample_document_chunk))
         self.mock_search_engine.create_index.side_effect = Exception("ES error")
         
         result = await self.data_loader.load_data()
@@ -69,9 +76,9 @@ class TestFastAPIDataLoader:
     async def test_refresh_data(self, sample_document_chunk):
         """Test data refresh (should be same as load_data)."""
         self.mock_fetcher.clone_or_update_repo.return_value = None
-        self.mock_fetcher.extract_documents.return_value = [sample_document_chunk]
+        self.mock_fetcher.iter_documents = MagicMock(return_value=_stream(sample_document_chunk))
         self.mock_search_engine.create_index.return_value = None
-        self.mock_search_engine.index_documents.return_value = None
+        self.mock_search_engine.index_documents.return_value = 1
         
         result = await self.data_loader.refresh_data()
         
@@ -3,6 +3,7 @@ Tests for document fetcher.
 """
 
 import pytest
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 from pathlib import Path
 
@@ -26,7 +27,8 @@ class TestFastAPIDocumentFetcher:
     @patch('src.document_fetcher.Repo')
     async def test_clone_or_update_repo_new(self, mock_repo_class):
         """Test cloning a new repository."""
-        mock_repo_class.clone_from.return_value = MagicMock()
+        mock_repo = MagicMock()
+        mock_repo_class.clone_from.return_value = mock_repo
         
         # Mock path not existing
         with patch.object(Path, 'exists', return_value=False):
@@ -35,21 +37,28 @@ class TestFastAPIDocumentFetcher:
         
         mock_repo_class.clone_from.assert_called_once_with(
             "https://github.com/fastapi/fastapi.git",
-            Path("/tmp/test_repo")
+            Path("/tmp/test_repo"),
+            depth=1,
+            filter='blob:none',
+            single_branch=True,
+            no_tags=True,
+            no_checkout=True
         )
+        mock_repo.git.sparse_checkout.assert_called_with('set', 'docs/en')
+        mock_repo.git.checkout.assert_called_once()
     
     @patch('src.document_fetcher.Repo')
     async def test_clone_or_update_repo_existing(self, mock_repo_class):
         """Test updating an existing repository."""
         mock_repo = MagicMock()
-        mock_repo.remotes.origin.pull.return_value = None
         mock_repo_class.return_value = mock_repo
         
         # Mock path existing
         with patch.object(Path, 'exists', return_value=True):
             await self.fetcher.clone_or_update_repo()
         
-        mock_repo.remotes.origin.pull.assert_called_once()
+        mock_repo.remotes.origin.fetch.assert_called_once_with(depth=1, no_tags=True)
+        mock_repo.git.reset.assert_called_once_with('--hard', 'origin/HEAD')
     
     async def test_extract_documents_no_docs_dir(self):
         """Test extracting documents when docs directory doesn't exist."""
@@ -74,10 +83,102 @@ class TestFastAPIDocumentFetcher:
         docs = await fetcher.extract_documents()
         
         assert len(docs) > 0
-        mock_processor.process_markdown_file.assert_called()
+        mock_processor.process_markdown_file.assert_called_once_with(
+            str(temp_test_dir / "docs" / "en" / "test.md"),
+            "https://fastapi.tiangolo.com/test",
+            "test"
+        )
+    
+    async def test_extract_documents_bounds_concurrency(self, tmp_path):
+        """Test that only a limited number of files are processed at once."""
+        docs_path = tmp_path / "docs" / "en"
+        docs_path.mkdir(parents=True)
+        for i in range(6):
+            (docs_path / f"page{i}.md").write_text("# Page")
+        
+        in_flight = 0
+        peak = 0
+        
+        async def process_markdown_file(file_path, base_url, doc_name=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return [MagicMock(id=file_path)]
+        
+        mock_processor = AsyncMock()
+        mock_processor.process_markdown_file.side_effect = process_markdown_file
+        fetcher = FastAPIDocumentFetcher(
+            "https://github.com/fastapi/fastapi.git",
+            str(tmp_path),
+            mock_processor,
+            max_concurrent_files=2
+        )
+        
+        docs = await fetcher.extract_documents()
+        
+        assert len(docs) == 6
+        assert peak == 2
+    
+    async def test_iter_documents_bounds_parsed_files_held(self, tmp_path):
+        """Test that a slow file doesn't let the rest of the tree parse ahead of it."""
+        docs_path = tmp_path / "docs" / "en"
+        docs_path.mkdir(parents=True)
+        for i in range(6):
+            (docs_path / f"page{i}.md").write_text("# Page")
+        md_files = [str(md_file) for md_file in docs_path.rglob("*.md")]
+        started = []
+        started_while_first_parsed = None
+        
+        async def process_markdown_file(file_path, base_url, doc_name=None):
+            nonlocal started_while_first_parsed
+            started.append(file_path)
+            if file_path == md_files[0]:
+                await asyncio.sleep(0.05)
+                started_while_first_parsed = len(started)
+            return [MagicMock(id=file_path)]
+        
+        mock_processor = AsyncMock()
+        mock_processor.process_markdown_file.side_effect = process_markdown_file
+        fetcher = FastAPIDocumentFetcher(
+            "https://github.com/fastapi/fastapi.git",
+            str(tmp_path),
+            mock_processor,
+            max_concurrent_files=2
+        )
+        
+        docs = [doc async for doc in fetcher.iter_documents()]
+        
+        assert [doc.id for doc in docs] == md_files
+        assert started_while_first_parsed == 2
+    
+    async def test_iter_documents_keeps_file_order(self, tmp_path):
+        """Test that chunks come out in file order even when later files finish first."""
+        docs_path = tmp_path / "docs" / "en"
+        docs_path.mkdir(parents=True)
+        for i in range(4):
+            (docs_path / f"page{i}.md").write_text("# Page")
+        md_files = [str(md_file) for md_file in docs_path.rglob("*.md")]
+        
+        async def process_markdown_file(file_path, base_url, doc_name=None):
+            # The first file takes longest
+            await asyncio.sleep(0.01 * (len(md_files) - md_files.index(file_path)))
+            return [MagicMock(id=file_path)]
+        
+        mock_processor = AsyncMock()
+        mock_processor.process_markdown_file.side_effect = process_markdown_file
+        fetcher = FastAPIDocumentFetcher(
+            "https://github.com/fastapi/fastapi.git",
+            str(tmp_path),
+            mock_processor
+        )
+        
+        docs = [doc async for doc in fetcher.iter_documents()]
+        
+        assert [doc.id for doc in docs] == md_files
     
     async def test_close(self):
         """Test closing the fetcher."""
-        self.fetcher.client = AsyncMock()
         await self.fetcher.close()
-        self.fetcher.client.aclose.assert_called_once()
+        assert not hasattr(self.fetcher, "client")
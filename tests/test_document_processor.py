@@ -3,10 +3,12 @@ Tests for document processor.
 """
 
 import pytest
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from unittest.mock import patch, mock_open
 
-from src.document_processor import FastAPIDocumentProcessor
+from src import document_processor
+from src.document_processor import FastAPIDocumentProcessor, parse_markdown
 
 
 class TestFastAPIDocumentProcessor:
@@ -67,6 +69,66 @@ class TestFastAPIDocumentProcessor:
         assert first_chunk.url == base_url
         assert first_chunk.section
         assert len(first_chunk.tags) > 0
+        # No h3/h4 heading precedes it, so there is no subsection to index
+        assert first_chunk.subsection is None
+    
+    @pytest.mark.asyncio
+    async def test_process_markdown_file_ids_from_doc_name(self, sample_markdown_content, tmp_path):
+        """Test that chunk ids use the document name, so same-named files don't collide."""
+        test_file = tmp_path / "index.md"
+        test_file.write_text(sample_markdown_content)
+        base_url = "https://fastapi.tiangolo.com/tutorial"
+        
+        chunks = await self.processor.process_markdown_file(str(test_file), base_url, "tutorial/index")
+        
+        assert [chunk.id for chunk in chunks] == [f"tutorial/index#{i}" for i in range(len(chunks))]
+    
+    @pytest.mark.asyncio
+    async def test_process_markdown_file_in_process_pool(self, sample_markdown_content, tmp_path):
+        """Test that parsing in a worker process matches parsing in-process."""
+        test_file = tmp_path / "test.md"
+        test_file.write_text(sample_markdown_content)
+        
+        base_url = "https://fastapi.tiangolo.com/test"
+        
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            processor = FastAPIDocumentProcessor(executor=executor)
+            chunks = await processor.process_markdown_file(str(test_file), base_url)
+        
+        expected = parse_markdown(sample_markdown_content, "test", base_url)
+        assert chunks == expected
+    
+    @pytest.mark.asyncio
+    async def test_process_markdown_file_reuses_unchanged_chunks(self, sample_markdown_content, tmp_path):
+        """Test that unchanged files are not parsed again."""
+        test_file = tmp_path / "test.md"
+        test_file.write_text(sample_markdown_content)
+        base_url = "https://fastapi.tiangolo.com/test"
+        
+        with patch('src.document_processor.parse_markdown', wraps=parse_markdown) as mock_parse:
+            first = await self.processor.process_markdown_file(str(test_file), base_url)
+            second = await self.processor.process_markdown_file(str(test_file), base_url)
+            assert second == first
+            assert mock_parse.call_count == 1
+            
+            test_file.write_text(sample_markdown_content + "\nA new paragraph that is long enough to become its own chunk.\n")
+            third = await self.processor.process_markdown_file(str(test_file), base_url)
+            assert len(third) == len(first) + 1
+            assert mock_parse.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_process_markdown_file_skips_reading_unmodified_files(self, sample_markdown_content, tmp_path):
+        """Test that a file with unchanged modification time and size is not read again."""
+        test_file = tmp_path / "test.md"
+        test_file.write_text(sample_markdown_content)
+        base_url = "https://fastapi.tiangolo.com/test"
+        
+        first = await self.processor.process_markdown_file(str(test_file), base_url)
+        with patch('src.document_processor.parse_markdown_file') as mock_read:
+            second = await self.processor.process_markdown_file(str(test_file), base_url)
+        
+        assert second == first
+        mock_read.assert_not_called()
     
     def test_extract_tags_multiple_patterns(self):
         """Test tag extraction with multiple matching patterns."""
@@ -84,6 +146,32 @@ class TestFastAPIDocumentProcessor:
         assert "pydantic" in tags
         assert "advanced-features" in tags
     
+    def test_extract_tags_whole_word_patterns(self):
+        """Test that word-bounded patterns only match whole words."""
+        tags = self.processor.extract_tags("We attest that the target gets posted", "")
+        assert "testing" not in tags
+        assert "http-methods" not in tags
+        
+        tags = self.processor.extract_tags("Run the test-client with GET", "")
+        assert "testing" in tags
+        assert "http-methods" in tags
+    
+    def test_extract_tags_hyperscan_matches_rule_table(self):
+        """Test that the Hyperscan scanner assigns the same tags as the rule table."""
+        pytest.importorskip("hyperscan")
+        contents = [
+            "Declare a path operation with @app.get and async def",
+            "We attest that the target gets posted to the Docker SQL database",
+            "Run a background task after the file upload; test CORS and WebSockets",
+            "Les dépendances: Depends, Auth, éGET et get_item"
+        ]
+        
+        for content in contents:
+            scanned = set(document_processor.extract_tags(content, ""))
+            with patch.object(document_processor, "_TAG_DATABASE", None):
+                expected = set(document_processor.extract_tags(content, ""))
+            assert scanned == expected
+    
     def test_extract_tags_empty_content(self):
         """Test tag extraction with empty content."""
         tags = self.processor.extract_tags("", "")
@@ -3,7 +3,7 @@ Integration tests for the FastAPI MCP Server.
 """
 
 import pytest
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from pathlib import Path
 
 from src.config import Config
@@ -20,39 +20,38 @@ class TestIntegration:
     
     @patch('src.search_engine.AsyncElasticsearch')
     @patch('src.document_fetcher.Repo')
-    async def test_full_data_loading_workflow(self, mock_repo_class, mock_es_class, temp_test_dir):
+    async def test_full_data_loading_workflow(self, mock_repo_class, mock_es_class, mock_streaming_bulk, temp_test_dir):
         """Test the complete data loading workflow."""
         # Mock Elasticsearch
         mock_es = AsyncMock()
         mock_es.indices.exists.return_value = False
         mock_es.indices.create.return_value = {"acknowledged": True}
+        mock_es.options = MagicMock(return_value=mock_es)
         mock_es_class.return_value = mock_es
         
         # Mock Git repo
         mock_repo_class.clone_from.return_value = None
         
-        # Mock async_bulk for indexing
-        with patch('src.search_engine.async_bulk', return_value=(1, [])):
-            # Create components
-            config = Config()
-            processor = FastAPIDocumentProcessor(config.FASTAPI_DOCS_URL)
-            fetcher = FastAPIDocumentFetcher(
-                config.FASTAPI_REPO_URL,
-                str(temp_test_dir),
-                processor,
-                config.FASTAPI_DOCS_URL
-            )
-            search_engine = ElasticsearchEngine(config.ELASTICSEARCH_URL, config.INDEX_NAME)
-            data_loader = FastAPIDataLoader(fetcher, search_engine)
-            
-            # Test data loading
-            result = await data_loader.load_data()
-            
-            assert result["status"] == "success"
-            assert result["document_count"] > 0
-            
-            # Verify Elasticsearch operations were called
-            mock_es.indices.create.assert_called_once()
+        # Create components
+        config = Config()
+        processor = FastAPIDocumentProcessor(config.FASTAPI_DOCS_URL)
+        fetcher = FastAPIDocumentFetcher(
+            config.FASTAPI_REPO_URL,
+            str(temp_test_dir),
+            processor,
+            config.FASTAPI_DOCS_URL
+        )
+        search_engine = ElasticsearchEngine(config.ELASTICSEARCH_URL, config.INDEX_NAME)
+        data_loader = FastAPIDataLoader(fetcher, search_engine)
+        
+        # Test data loading
+        result = await data_loader.load_data()
+        
+        assert result["status"] == "success"
+        assert result["document_count"] > 0
+        
+        # Verify Elasticsearch operations were called
+        mock_es.indices.create.assert_called_once()
     
     @patch('src.search_engine.AsyncElasticsearch')
     async def test_mcp_server_with_mocked_dependencies(self, mock_es_class):
@@ -66,11 +65,11 @@ class TestIntegration:
                         "_source": {
                             "id": "test-1",
                             "title": "Test Doc",
-                            "content": "Test content",
                             "url": "https://test.com",
                             "section": "Test",
                             "tags": ["test"]
                         },
+                        "fields": {"content": ["Test content"]},
                         "_score": 1.0
                     }
                 ]
@@ -0,0 +1,76 @@
+"""
+Tests for the server entry point.
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+import main
+from src.config import Config
+from src.mcp_server import FastAPIMCPServer
+
+
+class _FakeElasticsearchHandler(BaseHTTPRequestHandler):
+    """Answers index checks and searches like an Elasticsearch node with one document."""
+    
+    def do_HEAD(self):
+        self._respond(None)
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._respond({
+            "hits": {
+                "hits": [
+                    {
+                        "_source": {"id": "test-doc-1", "title": "Test Document"},
+                        "fields": {"content": ["Test content"]},
+                        "_score": 1.0
+                    }
+                ]
+            }
+        })
+    
+    def _respond(self, body):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_elasticsearch():
+    """Serve the fake Elasticsearch node from a thread, outliving any one event loop."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeElasticsearchHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_server_searches_on_the_startup_loop(fake_elasticsearch):
+    """Test that searches work after startup, across successive event loops in one process."""
+    results = []
+    
+    async def run_async(self):
+        results.append(await self.search_engine.search_documents("test"))
+    
+    with patch('main.Config', lambda: Config(ELASTICSEARCH_URL=fake_elasticsearch)), \
+            patch.object(FastAPIMCPServer, 'run_async', run_async):
+        # Each call is its own asyncio.run, like restarting the server in the same process
+        main.main()
+        main.main()
+    
+    assert [[hit["_source"]["id"] for hit in hits] for hits in results] == [["test-doc-1"]] * 2
@@ -63,7 +63,7 @@ class TestFastAPIMCPServer:
         assert len(result["results"]) == 1
         assert result["results"][0]["id"] == "test-1"
         
-        self.mock_search_engine.search_documents.assert_called_once_with("test query", None, 10)
+        self.mock_search_engine.search_documents.assert_called_once_with("test query", None, 10, preference=None)
     
     async def test_search_fastapi_docs_with_tags(self):
         """Test search with tag filtering."""
@@ -78,7 +78,7 @@ class TestFastAPIMCPServer:
         
         result = await search_tool.fn("test query", ["api", "pydantic"], 5)
         
-        self.mock_search_engine.search_documents.assert_called_once_with("test query", ["api", "pydantic"], 5)
+        self.mock_search_engine.search_documents.assert_called_once_with("test query", ["api", "pydantic"], 5, preference=None)
     
     async def test_search_fastapi_docs_error(self):
         """Test search operation with error."""
@@ -145,6 +145,8 @@ class TestFastAPIMCPServer:
         
         assert result == mock_result
         self.mock_data_loader.refresh_data.assert_called_once()
+        self.mock_search_engine.clear_result_cache.assert_called_once()
+        self.mock_search_engine.clear_doc_cache.assert_called_once()
     
     async def test_get_available_tags(self):
         """Test getting available tags."""
@@ -3,9 +3,13 @@ Tests for search engine.
 """
 
 import pytest
-from unittest.mock import AsyncMock, patch
+import asyncio
+from dataclasses import asdict, replace
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from src.search_engine import ElasticsearchEngine
+from elasticsearch.serializer import OrjsonSerializer
+
+from src.search_engine import ElasticsearchEngine, shutdown_all
 from src.interfaces import DocumentChunk
 
 
@@ -13,29 +17,76 @@ from src.interfaces import DocumentChunk
 class TestElasticsearchEngine:
     """Test cases for ElasticsearchEngine."""
     
-    def setup_method(self):
-        """Set up test fixtures."""
-        self.search_engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_client_configuration(self, mock_es_class):
+        """Test that the client is tuned for bulk loads and concurrent searches."""
+        ElasticsearchEngine("http://localhost:9200", "test_index")
+        
+        _, kwargs = mock_es_class.call_args
+        assert isinstance(kwargs["serializer"], OrjsonSerializer)
+        assert kwargs["connections_per_node"] == 32
+        assert kwargs["http_compress"] is True
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_client_shared_per_url(self, mock_es_class):
+        """Test that engines for the same URL share one client until shutdown."""
+        mock_es = AsyncMock()
+        mock_es_class.return_value = mock_es
+        
+        first = ElasticsearchEngine("http://localhost:9200", "test_index")
+        second = ElasticsearchEngine("http://localhost:9200", "other_index")
+        await first.close()
+        
+        assert first.es is second.es
+        mock_es_class.assert_called_once()
+        mock_es.close.assert_not_called()
+        
+        await shutdown_all()
+        mock_es.close.assert_called_once()
     
     @patch('src.search_engine.AsyncElasticsearch')
     async def test_create_index_new(self, mock_es_class):
         """Test creating a new index."""
         mock_es = AsyncMock()
-        mock_es.indices.get.side_effect = Exception("Index not found")
+        mock_es.indices.exists.return_value = False
         mock_es.indices.create.return_value = {"acknowledged": True}
         mock_es_class.return_value = mock_es
         
         engine = ElasticsearchEngine("http://localhost:9200", "test_index")
         await engine.create_index()
         
-        mock_es.indices.get.assert_called_once_with(index="test_index")
+        mock_es.indices.exists.assert_called_once_with(index="test_index")
+        mock_es.indices.delete.assert_not_called()
         mock_es.indices.create.assert_called_once()
     
     @patch('src.search_engine.AsyncElasticsearch')
     async def test_create_index_existing(self, mock_es_class):
-        """Test creating index when one already exists."""
+        """Test that an existing index with the current mapping is reused."""
+        mock_es = AsyncMock()
+        mock_es.indices.exists.return_value = False
+        mock_es_class.return_value = mock_es
+        
+        # Capture the mapping the engine creates, then report it back as existing
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        await engine.create_index()
+        mapping = mock_es.indices.create.call_args[1]["body"]["mappings"]
+        mock_es.indices.create.reset_mock()
+        mock_es.indices.exists.return_value = True
+        mock_es.indices.get_mapping.return_value = {"test_index": {"mappings": mapping}}
+        
+        await engine.create_index()
+        
+        mock_es.indices.delete.assert_not_called()
+        mock_es.indices.create.assert_not_called()
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_create_index_outdated_mapping(self, mock_es_class):
+        """Test that an index with an outdated mapping is recreated."""
         mock_es = AsyncMock()
-        mock_es.indices.get.return_value = {"test_index": {}}
+        mock_es.indices.exists.return_value = True
+        mock_es.indices.get_mapping.return_value = {
+            "test_index": {"mappings": {"properties": {"id": {"type": "text"}}}}
+        }
         mock_es.indices.delete.return_value = {"acknowledged": True}
         mock_es.indices.create.return_value = {"acknowledged": True}
         mock_es_class.return_value = mock_es
@@ -43,25 +94,133 @@ class TestElasticsearchEngine:
         engine = ElasticsearchEngine("http://localhost:9200", "test_index")
         await engine.create_index()
         
-        mock_es.indices.get.assert_called_once_with(index="test_index")
         mock_es.indices.delete.assert_called_once_with(index="test_index")
         mock_es.indices.create.assert_called_once()
     
     @patch('src.search_engine.AsyncElasticsearch')
-    @patch('src.search_engine.async_bulk')
-    async def test_index_documents(self, mock_bulk, mock_es_class, sample_document_chunk):
+    async def test_index_documents(self, mock_es_class, mock_streaming_bulk, sample_document_chunk):
         """Test indexing documents."""
         mock_es = AsyncMock()
+        mock_es.options = MagicMock()
         mock_es_class.return_value = mock_es
-        mock_bulk.return_value = (1, [])
         
         engine = ElasticsearchEngine("http://localhost:9200", "test_index")
         await engine.index_documents([sample_document_chunk])
         
-        mock_bulk.assert_called_once()
-        args, kwargs = mock_bulk.call_args
-        assert len(args[1]) == 1  # One document
-        assert args[1][0]["_id"] == "test-doc-1"
+        mock_streaming_bulk.assert_called_once()
+        args, kwargs = mock_streaming_bulk.call_args
+        actions = mock_streaming_bulk.indexed
+        assert len(actions) == 1  # One document
+        assert actions[0]["_id"] == "test-doc-1"
+        source = dict(actions[0]["_source"])
+        assert source.pop("indexed_at")
+        assert source == asdict(sample_document_chunk)
+        assert kwargs["chunk_size"] == 1000
+        assert kwargs["raise_on_error"] is False
+        assert kwargs["yield_ok"] is False
+        assert args[0] is mock_es.options.return_value
+        mock_es.options.assert_called_once_with(request_timeout=120)
+        assert [call.kwargs["settings"]["index"] for call in mock_es.indices.put_settings.call_args_list] == [
+            {"refresh_interval": "-1", "translog.durability": "async", "translog.flush_threshold_size": "1gb"},
+            {"refresh_interval": "5s", "translog.durability": "request"}
+        ]
+        mock_es.delete_by_query.assert_called_once()
+        assert mock_es.delete_by_query.call_args[1]["query"]["range"]["indexed_at"]["lt"] == actions[0]["_source"]["indexed_at"]
+        mock_es.indices.forcemerge.assert_called_once_with(index="test_index", max_num_segments=1)
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_index_documents_parallel_workers(self, mock_es_class, mock_streaming_bulk, sample_document_chunk):
+        """Test that documents are split across concurrent bulk workers."""
+        mock_es_class.return_value = AsyncMock(options=MagicMock())
+        documents = [
+            replace(sample_document_chunk, id=f"doc-{i}", content=f"Content {i}")
+            for i in range(6)
+        ]
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index", concurrency=3)
+        await engine.index_documents(documents)
+        
+        assert mock_streaming_bulk.call_count == 3
+        indexed_ids = sorted(action["_id"] for action in mock_streaming_bulk.indexed)
+        assert indexed_ids == sorted(doc.id for doc in documents)
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_index_documents_skips_duplicate_content(self, mock_es_class, mock_streaming_bulk, sample_document_chunk):
+        """Test that chunks with identical content are indexed once."""
+        mock_es_class.return_value = AsyncMock(options=MagicMock())
+        duplicate = replace(sample_document_chunk, id="test-doc-2")
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        await engine.index_documents([sample_document_chunk, duplicate])
+        
+        indexed_ids = [action["_id"] for action in mock_streaming_bulk.indexed]
+        assert indexed_ids == ["test-doc-1"]
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_index_documents_from_stream(self, mock_es_class, mock_streaming_bulk, sample_document_chunk):
+        """Test that an async stream of documents is indexed as it is consumed."""
+        mock_es_class.return_value = AsyncMock(options=MagicMock())
+        
+        async def stream():
+            for i in range(5):
+                yield replace(sample_document_chunk, id=f"doc-{i}", content=f"Content {i % 4}")
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index", concurrency=2)
+        count = await engine.index_documents(stream())
+        
+        assert count == 4
+        assert mock_streaming_bulk.call_count == 2
+        indexed_ids = sorted(action["_id"] for action in mock_streaming_bulk.indexed)
+        assert indexed_ids == ["doc-0", "doc-1", "doc-2", "doc-3"]
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_index_documents_empty_keeps_existing(self, mock_es_class, mock_streaming_bulk):
+        """Test that an empty load doesn't delete the previously indexed documents."""
+        mock_es = AsyncMock(options=MagicMock())
+        mock_es_class.return_value = mock_es
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        assert await engine.index_documents([]) == 0
+        
+        mock_es.delete_by_query.assert_not_called()
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_index_documents_keeps_stale_documents_on_failure(self, mock_es_class, sample_document_chunk):
+        """Test that a partially failed load doesn't delete documents it couldn't rewrite."""
+        mock_es = AsyncMock(options=MagicMock())
+        mock_es_class.return_value = mock_es
+        
+        async def streaming_bulk(client, actions, **kwargs):
+            async for action in actions:
+                yield False, {"index": {"_id": action["_id"], "status": 429}}
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        with patch('src.search_engine.async_streaming_bulk', side_effect=streaming_bulk):
+            assert await engine.index_documents([sample_document_chunk]) == 0
+        
+        mock_es.indices.refresh.assert_called_once()
+        mock_es.delete_by_query.assert_not_called()
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_index_documents_warns_on_duplicate_ids(self, mock_es_class, mock_streaming_bulk, sample_document_chunk, caplog):
+        """Test that distinct documents sharing an id are reported."""
+        mock_es_class.return_value = AsyncMock(options=MagicMock())
+        other = replace(sample_document_chunk, content="Different content about routers.")
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        await engine.index_documents([sample_document_chunk, other])
+        
+        assert "Duplicate document id test-doc-1" in caplog.text
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_index_documents_omits_null_fields(self, mock_es_class, mock_streaming_bulk, sample_document_chunk):
+        """Test that unset optional fields are left out of the indexed source."""
+        mock_es_class.return_value = AsyncMock(options=MagicMock())
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        await engine.index_documents([replace(sample_document_chunk, subsection=None)])
+        
+        assert "subsection" not in mock_streaming_bulk.indexed[0]["_source"]
     
     @patch('src.search_engine.AsyncElasticsearch')
     async def test_search_documents(self, mock_es_class):
@@ -71,7 +230,8 @@ class TestElasticsearchEngine:
             "hits": {
                 "hits": [
                     {
-                        "_source": {"id": "test-1", "title": "Test", "content": "Content"},
+                        "_source": {"id": "test-1", "title": "Test"},
+                        "fields": {"content": ["Content"]},
                         "_score": 1.0,
                         "highlight": {"content": ["Test <em>content</em>"]}
                     }
@@ -85,8 +245,87 @@ class TestElasticsearchEngine:
         
         assert len(results) == 1
         assert results[0]["_source"]["id"] == "test-1"
+        assert results[0]["_source"]["content"] == "Content"
+        assert "fields" not in results[0]
+        mock_es.search.assert_called_once()
+        body = mock_es.search.call_args[1]["body"]
+        assert "content" not in body["_source"]["includes"]
+        assert body["script_fields"]["content"]["script"]["params"] == {"chars": 500}
+        assert body["track_total_hits"] is False
+        assert mock_es.search.call_args[1]["search_type"] == "query_then_fetch"
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_search_documents_preference(self, mock_es_class):
+        """Test that the search preference is forwarded to Elasticsearch."""
+        mock_es = AsyncMock()
+        mock_es.search.return_value = {"hits": {"hits": []}}
+        mock_es_class.return_value = mock_es
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        await engine.search_documents("test query", preference="abc123")
+        
+        assert mock_es.search.call_args[1]["preference"] == "abc123"
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_concurrent_searches_batched(self, mock_es_class):
+        """Test that concurrent searches share a single msearch request."""
+        mock_es = AsyncMock()
+        mock_es.msearch.return_value = {
+            "responses": [
+                {"hits": {"hits": [{"_source": {"id": "test-1"}, "fields": {"content": ["One"]}}]}},
+                {"error": {"type": "search_phase_execution_exception"}}
+            ]
+        }
+        mock_es_class.return_value = mock_es
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        first, second = await asyncio.gather(
+            engine.search_documents("first query", preference="abc123"),
+            engine.search_documents("second query")
+        )
+        
+        assert first[0]["_source"] == {"id": "test-1", "content": "One"}
+        assert second == []
+        mock_es.search.assert_not_called()
+        searches = mock_es.msearch.call_args[1]["searches"]
+        assert len(searches) == 4
+        assert searches[0]["preference"] == "abc123"
+        assert "preference" not in searches[2]
+        assert searches[3]["query"]["bool"]["should"][0]["multi_match"]["query"] == "second query"
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_lone_search_not_delayed(self, mock_es_class):
+        """Test that a search with nothing else in flight is sent without waiting to batch."""
+        mock_es = AsyncMock()
+        mock_es.search.return_value = {"hits": {"hits": []}}
+        mock_es_class.return_value = mock_es
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index", search_batch_window=10)
+        await asyncio.wait_for(engine.search_documents("test query"), timeout=1)
+        
         mock_es.search.assert_called_once()
     
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_cancelled_search_batch_releases_callers(self, mock_es_class):
+        """Test that searches waiting on a cancelled batch fail instead of hanging."""
+        mock_es = AsyncMock()
+        started = asyncio.Event()
+        
+        async def search(**kwargs):
+            started.set()
+            await asyncio.Event().wait()
+        
+        mock_es.search.side_effect = search
+        mock_es_class.return_value = mock_es
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        pending = asyncio.create_task(engine.search_documents("test query"))
+        await started.wait()
+        for task in engine._search_tasks:
+            task.cancel()
+        
+        assert await asyncio.wait_for(pending, timeout=1) == []
+    
     @patch('src.search_engine.AsyncElasticsearch')
     async def test_search_documents_with_tags(self, mock_es_class):
         """Test searching documents with tag filters."""
@@ -100,6 +339,30 @@ class TestElasticsearchEngine:
         mock_es.search.assert_called_once()
         call_args = mock_es.search.call_args[1]
         assert "filter" in call_args["body"]["query"]["bool"]
+        assert call_args["body"]["query"]["bool"]["filter"] == [{"terms": {"tags": ["api", "pydantic"]}}]
+        assert call_args["request_cache"] is True
+    
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_search_documents_cached(self, mock_es_class):
+        """Test that repeated searches are served from the result cache."""
+        mock_es = AsyncMock()
+        mock_es.search.return_value = {
+            "hits": {"hits": [{"_source": {"id": "test-1"}, "fields": {"content": ["Content"]}}]}
+        }
+        mock_es_class.return_value = mock_es
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        first = await engine.search_documents("test query", tags=["pydantic", "api"])
+        second = await engine.search_documents("test query", tags=["api", "pydantic"])
+        
+        assert first == second
+        assert first is not second
+        mock_es.search.assert_called_once()
+        
+        # Re-indexing invalidates cached results
+        await engine.create_index()
+        await engine.search_documents("test query", tags=["api", "pydantic"])
+        assert mock_es.search.call_count == 2
     
     @patch('src.search_engine.AsyncElasticsearch')
     async def test_get_document_by_id(self, mock_es_class):
@@ -117,6 +380,25 @@ class TestElasticsearchEngine:
         assert result["title"] == "Test Document"
         mock_es.get.assert_called_once_with(index="test_index", id="test-1")
     
+    @patch('src.search_engine.AsyncElasticsearch')
+    async def test_get_document_by_id_cached(self, mock_es_class):
+        """Test that repeated document lookups are served from the document cache."""
+        mock_es = AsyncMock()
+        mock_es.get.return_value = {"_source": {"id": "test-1", "tags": ["api"]}}
+        mock_es_class.return_value = mock_es
+        
+        engine = ElasticsearchEngine("http://localhost:9200", "test_index")
+        first = await engine.get_document_by_id("test-1")
+        first["tags"].append("changed")
+        second = await engine.get_document_by_id("test-1")
+        
+        assert second == {"id": "test-1", "tags": ["api"]}
+        mock_es.get.assert_called_once()
+        
+        await engine.clear_doc_cache()
+        await engine.get_document_by_id("test-1")
+        assert mock_es.get.call_count == 2
+    
     @patch('src.search_engine.AsyncElasticsearch')
     async def test_get_document_by_id_not_found(self, mock_es_class):
         """Test getting document by ID when not found."""